@@ -1,5 +1,6 @@
 import asyncio
 from contextlib import suppress
+from typing import Tuple
 
 from aiohttp.web import (
     Application,
@@ -9,22 +10,40 @@ from aiohttp.web import (
     TCPSite,
     json_response,
 )
-from dico import GuildMember
+from dico import GuildMember, GuildMemberRemove, GuildMemberUpdate
 from dico.exception import HTTPError
+from dico_command import on
 
-from laythe import LaytheAddonBase, LaytheBot, Setting
+from laythe import LaytheAddonBase, LaytheBot, SettingConflict
+from laythe.database.cache import TTLCache
+from laythe.metrics import REGISTRY
 
 
 class Dashboard(LaytheAddonBase):
     app: Application
     runner: AppRunner
+    MEMBER_CACHE_SIZE = 10000
+    MEMBER_CACHE_TTL = 60 * 5
+    MEMBER_FETCH_CONCURRENCY = 10
+    GUILD_FETCH_CONCURRENCY = 5
+    USER_INFOS_DEADLINE = 10
+    LEADERBOARD_MAX_LIMIT = 100
 
     def on_load(self):
+        self.members: TTLCache[Tuple[str, str], dict] = TTLCache(
+            self.MEMBER_CACHE_SIZE, self.MEMBER_CACHE_TTL
+        )
+        self.member_fetches = asyncio.Semaphore(self.MEMBER_FETCH_CONCURRENCY)
+        self.guild_fetches = asyncio.Semaphore(self.GUILD_FETCH_CONCURRENCY)
         self.app = Application()
         self.app.router.add_post("/userinfos", self.get_user_infos)
         self.app.router.add_post("/levels", self.get_required_levels)
         self.app.router.add_get("/guild/{id}", self.get_guild)
+        self.app.router.add_get("/leaderboard/{id}", self.get_leaderboard)
+        self.app.router.add_get("/metrics", self.get_metrics)
+        self.app.router.add_get("/handlers", self.get_handlers)
         self.app.router.add_post("/settings", self.set_settings)
+        self.app.router.add_post("/settings/{id}/invalidate", self.invalidate_settings)
         self.bot.loop.create_task(self.start())
 
     def on_unload(self):
@@ -39,6 +58,14 @@ class Dashboard(LaytheAddonBase):
     async def stop(self):
         await self.runner.cleanup()
 
+    @on("guild_member_update")
+    async def on_guild_member_update(self, member: GuildMemberUpdate):
+        self.members.pop((str(member.guild_id), str(member.user.id)))
+
+    @on("guild_member_remove")
+    async def on_guild_member_remove(self, member: GuildMemberRemove):
+        self.members.pop((str(member.guild_id), str(member.user.id)))
+
     async def get_user_infos(self, request: Request):
         guild_ids = None
         user_ids = None
@@ -49,47 +76,47 @@ class Dashboard(LaytheAddonBase):
         if not guild_ids or not user_ids:
             return json_response({"reason": "Invalid form."}, status=400)
 
-        users = {}
-
-        for guild_id in guild_ids:
-            guild_users = {}
-            unresolved = []
-            cached = self.bot.cache.get_guild_container(guild_id)
+        user_ids = list(dict.fromkeys(map(str, user_ids)))
+        users = {guild_id: {} for guild_id in guild_ids}
 
-            for user_id in user_ids:
-                member = cached.get(user_id, "member")
-                if member:
-                    guild_users[str(member.id)] = self.format_member(member)
-                else:
-                    unresolved.append(user_id)
+        async def resolve(guild_id):
+            async with self.guild_fetches:
+                await self.resolve_members(guild_id, user_ids, users[guild_id])
 
-            if len(unresolved) == 1:
-                user_id = unresolved[0]
-                with suppress(HTTPError):
-                    member = await self.bot.request_guild_member(guild_id, user_id)
-                    guild_users[str(member.id)] = self.format_member(member)
-                    del unresolved[0]
+        tasks = [self.bot.loop.create_task(resolve(x)) for x in users]
+        _, pending = await asyncio.wait(tasks, timeout=self.USER_INFOS_DEADLINE)
+        for task in pending:
+            task.cancel()
 
-            last_id = None
-            while len(unresolved) != 0:
-                members = await self.bot.list_guild_members(
-                    guild_id, limit=1000, after=last_id
-                )
+        for guild_users in users.values():
+            guild_users["unresolved"] = [x for x in user_ids if x not in guild_users]
 
-                copy = unresolved.copy()
+        return json_response(users)
 
-                for member in filter(lambda m: m.id in copy, members):
-                    guild_users[str(member.id)] = self.format_member(member)
-                    unresolved.remove(str(member.id))
+    async def resolve_members(self, guild_id, user_ids, resolved: dict):
+        missing = []
+        cached = self.bot.cache.get_guild_container(guild_id)
 
-                if len(members) < 1000:
-                    break
-                last_id = members[-1].id
+        for user_id in user_ids:
+            member = cached.get(user_id, "member") if cached else None
+            info = (
+                self.format_member(member)
+                if member
+                else self.members.get((str(guild_id), user_id))
+            )
+            if info:
+                resolved[user_id] = info
+            else:
+                missing.append(user_id)
 
-            guild_users["unresolved"] = unresolved
-            users[guild_id] = guild_users
+        async def fetch(user_id: str):
+            async with self.member_fetches:
+                with suppress(HTTPError):
+                    member = await self.bot.request_guild_member(guild_id, user_id)
+                    resolved[user_id] = info = self.format_member(member)
+                    self.members.set((str(guild_id), user_id), info)
 
-        return json_response(users)
+        await asyncio.gather(*map(fetch, missing))
 
     @staticmethod
     def format_member(member: GuildMember):
@@ -113,21 +140,8 @@ class Dashboard(LaytheAddonBase):
             return json_response({"reason": "Invalid form."}, status=400)
 
         level_addon = self.bot.addons[self.bot.addon_names.index("레벨")]
-
-        resp = []
-
-        for i, level in enumerate(levels):
-            exp = level_addon.calc_exp_required(int(level) + 1)
-            exp_before = level_addon.calc_exp_required(int(level))
-            before = int(exps[i])
-            resp.append(
-                [
-                    str(round(exp)),
-                    str(round(((before - exp_before) / (exp - exp_before)) * 100)),
-                ]
-            )
-
-        return json_response(resp)
+        resp = level_addon.calc_progress(levels, exps)
+        return json_response([[str(exp), str(percent)] for exp, percent in resp])
 
     async def get_guild(self, request: Request):
         guild_id = request.match_info["id"]
@@ -142,15 +156,70 @@ class Dashboard(LaytheAddonBase):
         """
         return json_response(guild.raw if guild else guild)
 
+    async def get_leaderboard(self, request: Request):
+        try:
+            guild_id = int(request.match_info["id"])
+            limit = min(int(request.query.get("limit", 50)), self.LEADERBOARD_MAX_LIMIT)
+            after = request.query.get("after")
+            after = tuple(map(int, after.split(":"))) if after else None
+        except ValueError:
+            return json_response({"reason": "Invalid query."}, status=400)
+        if limit < 1 or (after and len(after) != 2):
+            return json_response({"reason": "Invalid query."}, status=400)
+        levels, total = await asyncio.gather(
+            self.bot.database.request_leaderboard(guild_id, after, limit),
+            self.bot.database.request_level_count(guild_id),
+        )
+        return json_response(
+            {
+                "total": total,
+                "levels": [
+                    {
+                        **x.to_dict(),
+                        "user_id": str(x.user_id),
+                        "guild_id": str(x.guild_id),
+                        "rank": x.rank,
+                    }
+                    for x in levels
+                ],
+                "next": f"{levels[-1].exp}:{levels[-1].user_id}"
+                if len(levels) == limit
+                else None,
+            }
+        )
+
+    async def get_metrics(self, request: Request):
+        return Response(text=REGISTRY.render(), content_type="text/plain")
+
+    async def get_handlers(self, request: Request):
+        return json_response(self.bot.tracer.to_dict())
+
     async def set_settings(self, request: Request):
         if not request.body_exists:
             return json_response({"reason": "Invalid form."}, status=400)
         try:
             body = await request.json()
-            setting = Setting(body)
-        except KeyError:
+            setting = await self.bot.database.request_guild_setting(
+                int(body["guild_id"]), bypass_cache=True
+            )
+            # Only fields that differ from the stored row are written, a `version` makes it conditional.
+            setting.merge(body)
+        except (KeyError, TypeError, ValueError):
             return json_response({"reason": "Invalid body."}, status=400)
-        await self.bot.database.update_guild_setting(setting)
+        try:
+            await self.bot.database.update_guild_setting(setting)
+        except SettingConflict:
+            return json_response(
+                {"reason": "Settings were changed in the meantime."}, status=409
+            )
+        return Response(status=204)
+
+    async def invalidate_settings(self, request: Request):
+        try:
+            guild_id = int(request.match_info["id"])
+        except ValueError:
+            return json_response({"reason": "Invalid guild ID."}, status=400)
+        self.bot.database.invalidate_guild_setting(guild_id)
         return Response(status=204)
 
 
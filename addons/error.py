@@ -14,6 +14,7 @@ from laythe import (
     LaytheBot,
     PermissionNotFound,
     PermissionUnavailable,
+    SettingConflict,
     permission_translates,
 )
 from laythe.utils import EmbedColor
@@ -41,6 +42,9 @@ class Error(LaytheAddonBase, name="오류"):
         elif isinstance(ex, PermissionUnavailable):
             base.title += "권한 정보를 가져오지 못했어요."
             base.description = "명령어를 다시 사용해주세요. 그래도 문제가 계속된다면, [CodeNU](https://discord.gg/gqJBhar) 디스코드 서버에서 문의해주세요."
+        elif isinstance(ex, SettingConflict):
+            base.title += "그 사이에 다른 곳에서 설정이 변경되었어요."
+            base.description = "설정 명령어를 다시 사용해주세요."
         else:
             base.title += "예기치 못한 오류가 발생했어요..."
             base.description = f"디버깅용 메시지: ```py\n{edited_tb}\n```"
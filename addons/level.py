@@ -1,6 +1,7 @@
+import bisect
 import random
-import time
 from contextlib import suppress
+from typing import Iterable, List, Tuple, Union
 
 from dico import (
     ActionRow,
@@ -21,14 +22,52 @@ from dico_interaction import (
     slash,
 )
 
-from laythe import LaytheAddonBase, LaytheBot, has_perm
+from laythe import LaytheAddonBase, LaytheBot, Priority, has_perm
 from laythe.utils import EmbedColor, create_index_bar
 
 
+def calc_exp_curve(level: int) -> float:
+    return 5 / 6 * level * (2 * level * level + 27 * level + 91)
+
+
+# Precomputed for every level anyone realistically reaches, the closed form covers the rest.
+EXP_TABLE_SIZE = 1000
+EXP_TABLE: List[float] = [calc_exp_curve(x) for x in range(EXP_TABLE_SIZE + 1)]
+
+
 class Level(LaytheAddonBase, name="레벨"):
     @staticmethod
     def calc_exp_required(level: int) -> float:
-        return 5 / 6 * level * (2 * level * level + 27 * level + 91)
+        if 0 <= level <= EXP_TABLE_SIZE:
+            return EXP_TABLE[level]
+        return calc_exp_curve(level)
+
+    @staticmethod
+    def calc_level(exp: int) -> int:
+        # The highest level whose required exp is below `exp`, same rule as the level-up check.
+        if exp <= EXP_TABLE[-1]:
+            return max(bisect.bisect_left(EXP_TABLE, exp) - 1, 0)
+        low, high = EXP_TABLE_SIZE, EXP_TABLE_SIZE * 2
+        while calc_exp_curve(high) < exp:
+            low, high = high, high * 2
+        while low + 1 < high:
+            mid = (low + high) // 2
+            if calc_exp_curve(mid) < exp:
+                low = mid
+            else:
+                high = mid
+        return low
+
+    @classmethod
+    def calc_progress(
+        cls, levels: Iterable[Union[int, str]], exps: Iterable[Union[int, str]]
+    ) -> List[Tuple[int, int]]:
+        calc = cls.calc_exp_required
+        resp = []
+        for level, exp in zip(map(int, levels), map(int, exps)):
+            before, after = calc(level), calc(level + 1)
+            resp.append((round(after), round((exp - before) / (after - before) * 100)))
+        return resp
 
     @slash("레벨", description="자신 또는 해당 유저의 레벨을 보여줘요.", connector={"유저": "user"})
     @option(ApplicationCommandOptionType.USER, name="유저", description="레벨 정보를 볼 유저")
@@ -38,9 +77,13 @@ class Level(LaytheAddonBase, name="레벨"):
         if not setting.flags.use_level:
             return await ctx.send("❌ 이 서버에서는 레벨 기능을 사용하지 않아요.")
         user = user or ctx.member
-        level = await self.bot.database.request_level(int(ctx.guild_id), int(user))
+        level = self.bot.database.level_buffer.peek(
+            int(ctx.guild_id), int(user)
+        ) or await self.bot.database.request_level(int(ctx.guild_id), int(user))
         if not level:
             return await ctx.send("ℹ 해당 유저의 레벨 기록이 존재하지 않아요.")
+        ranks = await self.bot.database.request_rank_index(int(ctx.guild_id))
+        rank = ranks.rank(level.exp)
         exp_req = self.calc_exp_required(level.level + 1)
         level_bar = create_index_bar(
             exp_req,
@@ -55,7 +98,7 @@ class Level(LaytheAddonBase, name="레벨"):
             12,
         )
         embed = Embed(
-            title=f"레벨 {level.level} (#{level.rank})",
+            title=f"레벨 {level.level} (#{rank})",
             description=f"> {level_bar} [**{level.exp}**/**{int(exp_req)}**]",
             color=EmbedColor.DEFAULT,
             timestamp=ctx.id.timestamp,
@@ -105,6 +148,15 @@ class Level(LaytheAddonBase, name="레벨"):
         )
         await ctx.edit_original_response(content="✅ 성공적으로 레벨을 리셋했어요.", components=[])
 
+    @slash("레벨정리", description="경험치와 맞지 않게 저장된 이 서버의 레벨을 다시 계산해요.")
+    @checks(has_perm(manage_guild=True))
+    async def recalculate_levels(self, ctx: InteractionContext):
+        await ctx.defer(ephemeral=True)
+        count = await self.bot.database.recalculate_levels(
+            int(ctx.guild_id), self.calc_level
+        )
+        await ctx.send(f"✅ {count}명의 레벨을 다시 계산했어요.")
+
     @slash("레벨제외", description="특정 채널을 레벨 시스템에서 제외시키는 방법을 알려줘요.")
     @checks(has_perm(manage_guild=True))
     async def exclude_level(self, ctx: InteractionContext):
@@ -118,6 +170,7 @@ class Level(LaytheAddonBase, name="레벨"):
             message.author.bot
             or not message.channel.guild_id
             or "laythe:leveloff" in (message.channel.topic or "")
+            or not self.bot.database.has_flag(int(message.guild_id), "use_level")
         ):
             return
 
@@ -125,45 +178,69 @@ class Level(LaytheAddonBase, name="레벨"):
         if not setting.flags.use_level:
             return
 
-        cached = await self.bot.database.get_last_message_timestamp(
-            int(message.guild_id), int(message.author)
-        )
-        time_now = round(time.time())
-        if cached and cached + 60 > time_now:
+        if not self.bot.database.level_cooldown.hit(
+            (int(message.guild_id), int(message.author))
+        ):
             return
-        await self.bot.database.update_last_message_timestamp(
-            int(message.guild_id), int(message.author)
-        )
 
-        current = await self.bot.database.request_level(
+        current = await self.bot.database.level_buffer.get(
             int(message.guild_id), int(message.author)
         )
         level = current.level
         level_up = False
 
-        current.exp += random.randint(5, 25)
-        required_exp = self.calc_exp_required(level + 1)
-        if required_exp < current.exp:
-            current.level += 1
+        self.bot.database.level_buffer.add_exp(current, random.randint(5, 25))
+        new_level = self.calc_level(current.exp)
+        if new_level > level:
+            current.level = new_level
             level_up = True
-            await message.channel.send(
-                f"🎉 {message.author.mention}님의 레벨이 올라갔어요! (`{level}` -> `{current.level}`)"
+            await self.bot.rest.run(
+                Priority.REPLY,
+                f"channel:{message.channel_id}",
+                message.channel.send,
+                f"🎉 {message.author.mention}님의 레벨이 올라갔어요! (`{level}` -> `{current.level}`)",
             )
-        await self.bot.database.update_level(current)
         if level_up:
             if not setting.reward_roles:
                 return
-            reward_roles = setting.reward_roles.as_dict()
-            for k, v in sorted(reward_roles.items(), key=lambda n: n[0]):
-                if current.level >= int(k):
-                    if v in message.member.role_ids:
-                        continue
-                    with suppress(HTTPError):
-                        await self.bot.add_guild_member_role(
-                            message.guild_id, message.author, v, reason="레벨업 보상"
-                        )
-                else:
-                    break
+            cached = self.bot.cache.get_guild_container(message.guild_id)
+            member = cached.get(message.author.id, "member")
+            role_ids = (member or message.member).role_ids
+            roles = cached.get_storage("role")
+            # Deleted reward roles would fail the whole PATCH, leave them out.
+            missing = [
+                x
+                for x in setting.reward_roles.roles_for(current.level)
+                if x not in role_ids and (not roles.size or roles.get(x))
+            ]
+            if not missing:
+                return
+            route = f"guild:{message.guild_id}"
+            if len(missing) > 1:
+                try:
+                    return await self.bot.rest.run(
+                        Priority.REPLY,
+                        route,
+                        self.bot.modify_guild_member,
+                        message.guild_id,
+                        message.author,
+                        roles=[*role_ids, *missing],
+                        reason="레벨업 보상",
+                    )
+                except HTTPError:
+                    pass
+            # One role, or the PATCH was refused: grant what can be granted one by one.
+            for role_id in missing:
+                with suppress(HTTPError):
+                    await self.bot.rest.run(
+                        Priority.REPLY,
+                        route,
+                        self.bot.add_guild_member_role,
+                        message.guild_id,
+                        message.author,
+                        role_id,
+                        reason="레벨업 보상",
+                    )
 
 
 def load(bot: LaytheBot):
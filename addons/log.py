@@ -24,6 +24,7 @@ from dico import (
     MessageReactionRemoveAll,
     MessageUpdate,
     Role,
+    WebhooksUpdate,
 )
 from dico.exception import HTTPError
 from dico_command import on
@@ -32,6 +33,7 @@ from dico_interaction import InteractionContext
 from laythe import (
     LaytheAddonBase,
     LaytheBot,
+    Priority,
     permission_translates,
     rtc_region_translates,
     verification_level_translates,
@@ -142,7 +144,10 @@ class Log(LaytheAddonBase, name="로깅"):
                 files = [x.url for x in message.attachments]
                 extra_msg = "\n".join(files)
                 embed.add_field(name="첨부파일", value=f"{len(files)}개", inline=False)
-        resp = await self.bot.execute_log(message_delete.guild, embed=embed)
+        # Attachment links are replied to the log message, so it can't be shared by a batch.
+        resp = await self.bot.execute_log(
+            message_delete.guild, batch=not extra_msg, embed=embed
+        )
         if resp and extra_msg:
             await resp.reply(extra_msg)
 
@@ -178,8 +183,13 @@ class Log(LaytheAddonBase, name="로깅"):
         embed.set_footer(text=f"채널 ID: {channel.id}")
         await self.bot.execute_log(channel.guild, embed=embed)
 
+    @on("webhooks_update")
+    async def on_webhooks_update(self, update: WebhooksUpdate):
+        self.bot.log_webhooks.pop(int(update.channel_id), None)
+
     @on("channel_delete")
     async def on_channel_delete(self, channel: ChannelDelete):
+        self.bot.log_webhooks.pop(int(channel.id), None)
         embed = Embed(title="채널 삭제", color=EmbedColor.NEGATIVE, timestamp=kstnow())
         embed.add_field(name="채널 이름", value=f"`#{channel.name}`", inline=False)
         embed.set_footer(text=f"채널 ID: {channel.id}")
@@ -552,13 +562,20 @@ class Log(LaytheAddonBase, name="로깅"):
         if not data.welcome_channel:
             return
         if data.greet:
-            await self.bot.create_message(
-                data.welcome_channel, data.greet.format(mention=member.mention)
+            await self.bot.rest.run(
+                Priority.REPLY,
+                f"channel:{data.welcome_channel}",
+                self.bot.create_message,
+                data.welcome_channel,
+                data.greet.format(mention=member.mention),
             )
         if data.greet_dm and member.user and not member.user.bot:
             with suppress(HTTPError):
-                await member.user.send(
-                    f"> `{self.bot.get_guild(member.guild_id).name}`에서 자동으로 전송한 환영 메세지에요.\n{data.greet_dm.format(name=str(member.user))}"
+                await self.bot.rest.run(
+                    Priority.REPLY,
+                    "dm",
+                    member.user.send,
+                    f"> `{self.bot.get_guild(member.guild_id).name}`에서 자동으로 전송한 환영 메세지에요.\n{data.greet_dm.format(name=str(member.user))}",
                 )
 
     @on("guild_member_remove")
@@ -581,8 +598,12 @@ class Log(LaytheAddonBase, name="로깅"):
         )
         if not data.welcome_channel or not data.bye:
             return
-        await self.bot.create_message(
-            data.welcome_channel, data.bye.format(name=str(member_delete.user))
+        await self.bot.rest.run(
+            Priority.REPLY,
+            f"channel:{data.welcome_channel}",
+            self.bot.create_message,
+            data.welcome_channel,
+            data.bye.format(name=str(member_delete.user)),
         )
 
     @on("message_reaction_remove_all")
@@ -5,7 +5,7 @@ from dico import ApplicationCommandOptionType, GuildMember, User
 from dico.exception import BadRequest, DicoException, Forbidden, NotFound
 from dico_interaction import InteractionContext, checks, option, slash
 
-from laythe import DMNotAllowedAddonBase, LaytheBot, bot_has_perm, has_perm
+from laythe import DMNotAllowedAddonBase, LaytheBot, Priority, bot_has_perm, has_perm
 
 PURGE_METADATA = {"name": "정리", "description": "메시지 정리와 관련된 명령어들이에요."}
 
@@ -32,7 +32,10 @@ class Manage(DMNotAllowedAddonBase, name="관리"):
         except BadRequest:
             return await ctx.send("❌ 삭제할 메시지를 가져오지 못했어요. 2주 이내에 전송된 메시지만 가져울 수 있어요.")
         msgs = await self.bot.request_channel_messages(ctx.channel_id, limit=count)
-        await self.bot.bulk_delete_messages(
+        await self.bot.rest.run(
+            Priority.MODERATION,
+            f"channel:{ctx.channel_id}",
+            self.bot.bulk_delete_messages,
             ctx.channel_id,
             *msgs,
             reason=f"유저 ID가 `{ctx.author.id}`인 관리자가 `/정리 개수 개수:{count}` 명령어를 실행함.",
@@ -107,7 +110,10 @@ class Manage(DMNotAllowedAddonBase, name="관리"):
             msgs = [x for x in msgs if x.author == user]
         except BadRequest:
             return await ctx.send("❌ 삭제할 메시지를 가져오지 못했어요. 2주 이내에 전송된 메시지만 가져울 수 있어요.")
-        await self.bot.bulk_delete_messages(
+        await self.bot.rest.run(
+            Priority.MODERATION,
+            f"channel:{ctx.channel_id}",
+            self.bot.bulk_delete_messages,
             ctx.channel_id,
             *msgs,
             reason=f"유저 ID가 `{ctx.author.id}`인 관리자가 `/정리 유저 유저:{user} 범위:{search_range}` 명령어를 실행함.",
@@ -171,15 +177,27 @@ class Manage(DMNotAllowedAddonBase, name="관리"):
         await ctx.defer()
         if use_timeout:
             end_at = datetime.utcnow() + timedelta(days=timeout)
-            await self.bot.modify_guild_member(
-                ctx.guild_id, user, communication_disabled_until=end_at, reason=reason
+            await self.bot.rest.run(
+                Priority.MODERATION,
+                f"guild:{ctx.guild_id}",
+                self.bot.modify_guild_member,
+                ctx.guild_id,
+                user,
+                communication_disabled_until=end_at,
+                reason=reason,
             )
         else:
             data = await self.bot.database.request_guild_setting(int(ctx.guild_id))
             if not data.mute_role:
                 return await ctx.send("❌ 뮤트 역할이 존재하지 않아요. 먼저 뮤트 역할을 설정해주세요.")
-            await self.bot.add_guild_member_role(
-                ctx.guild_id, user, data.mute_role, reason=reason
+            await self.bot.rest.run(
+                Priority.MODERATION,
+                f"guild:{ctx.guild_id}",
+                self.bot.add_guild_member_role,
+                ctx.guild_id,
+                user,
+                data.mute_role,
+                reason=reason,
             )
         await ctx.send(
             f"✅ 성공적으로 <@!{int(user)}>{'에게 타임아웃을 적용했어요.' if use_timeout else '를 뮤트했어요.'}"
@@ -219,15 +237,27 @@ class Manage(DMNotAllowedAddonBase, name="관리"):
     ):
         await ctx.defer()
         if use_timeout:
-            await self.bot.modify_guild_member(
-                ctx.guild_id, user, communication_disabled_until=None, reason=reason
+            await self.bot.rest.run(
+                Priority.MODERATION,
+                f"guild:{ctx.guild_id}",
+                self.bot.modify_guild_member,
+                ctx.guild_id,
+                user,
+                communication_disabled_until=None,
+                reason=reason,
             )
         else:
             data = await self.bot.database.request_guild_setting(int(ctx.guild_id))
             if not data.mute_role:
                 return await ctx.send("❌ 뮤트 역할이 존재하지 않아요. 먼저 뮤트 역할을 설정해주세요.")
-            await self.bot.remove_guild_member_role(
-                ctx.guild_id, user, data.mute_role, reason=reason
+            await self.bot.rest.run(
+                Priority.MODERATION,
+                f"guild:{ctx.guild_id}",
+                self.bot.remove_guild_member_role,
+                ctx.guild_id,
+                user,
+                data.mute_role,
+                reason=reason,
             )
         await ctx.send(
             f"✅ 성공적으로 <@!{int(user)}>{'에게 타임아웃을 제거했어요.' if use_timeout else '를 언뮤트했어요.'}"
@@ -244,7 +274,13 @@ class Manage(DMNotAllowedAddonBase, name="관리"):
     async def kick(self, ctx: InteractionContext, user: GuildMember):
         await ctx.defer()
         try:
-            await self.bot.remove_guild_member(ctx.guild_id, user)
+            await self.bot.rest.run(
+                Priority.MODERATION,
+                f"guild:{ctx.guild_id}",
+                self.bot.remove_guild_member,
+                ctx.guild_id,
+                user,
+            )
         except NotFound:
             await ctx.send("❌ 추방할 사용자를 찾지 못했어요.")
         except Forbidden:
@@ -291,7 +327,10 @@ class Manage(DMNotAllowedAddonBase, name="관리"):
         await ctx.defer()
         try:
             delete_message_days = min(delete_message_days, 7)
-            await self.bot.create_guild_ban(
+            await self.bot.rest.run(
+                Priority.MODERATION,
+                f"guild:{ctx.guild_id}",
+                self.bot.create_guild_ban,
                 ctx.guild_id,
                 user,
                 delete_message_days=delete_message_days,
@@ -157,11 +157,11 @@ class Setting(LaytheAddonBase, name="설정"):
     async def send_end_message(self, ctx: InteractionContext, as_update: bool = True):
         if as_update:
             await ctx.edit_original_response(
-                content=f"✅ 설정을 종료했어요. 실제 적용까지는 최대 5분 정도 걸릴 수 있어요.\n{self.VOTE_AD}",
+                content=f"✅ 설정을 종료했어요.\n{self.VOTE_AD}",
                 components=[],
             )
         else:
-            await ctx.send(f"✅ 설정을 종료했어요. 실제 적용까지는 최대 5분 정도 걸릴 수 있어요.\n{self.VOTE_AD}")
+            await ctx.send(f"✅ 설정을 종료했어요.\n{self.VOTE_AD}")
 
     @staticmethod
     def create_flags_menu(setting: SettingData):
@@ -218,8 +218,11 @@ class Setting(LaytheAddonBase, name="설정"):
                 ephemeral=True,
             )
         elif value == "save":
-            await self.bot.database.update_guild_setting(setting)
-            del self.buffer[ctx.guild_id]
+            # Close the session even on SettingConflict, the user is told to start over.
+            try:
+                await self.bot.database.update_guild_setting(setting)
+            finally:
+                self.buffer.pop(ctx.guild_id, None)
             return await self.send_end_message(ctx)
         await ctx.edit_original_response(components=[self.create_flags_menu(setting)])
 
@@ -269,7 +272,7 @@ class Setting(LaytheAddonBase, name="설정"):
             del setting.reward_roles[str(level)]
         await self.bot.database.update_guild_setting(setting)
         await ctx.send(
-            f"✅ 성공적으로 레벨 **{level}** 보상을 {'추가' if action == 'add' else '삭제'}했어요. 실제 적용까지는 최대 5분 정도 걸릴 수 있어요.\n{self.VOTE_AD}"
+            f"✅ 성공적으로 레벨 **{level}** 보상을 {'추가' if action == 'add' else '삭제'}했어요.\n{self.VOTE_AD}"
         )
 
     @slash(
@@ -293,7 +296,7 @@ class Setting(LaytheAddonBase, name="설정"):
         setting.mute_role = int(role) if role else role
         await self.bot.database.update_guild_setting(setting)
         await ctx.send(
-            f"✅ 성공적으로 뮤트 역할을 {f'<@&{role.id}>으로 설정' if role else '삭제'}했어요. 실제 적용까지는 최대 5분 정도 걸릴 수 있어요.\n{self.VOTE_AD}"
+            f"✅ 성공적으로 뮤트 역할을 {f'<@&{role.id}>으로 설정' if role else '삭제'}했어요.\n{self.VOTE_AD}"
         )
 
     @slash(
@@ -319,7 +322,7 @@ class Setting(LaytheAddonBase, name="설정"):
         setting.log_channel = int(channel) if channel else channel
         await self.bot.database.update_guild_setting(setting)
         await ctx.send(
-            f"✅ 성공적으로 로그 채널을 {f'<#{channel.id}>으로 설정' if channel else '삭제'}했어요. 실제 적용까지는 최대 5분 정도 걸릴 수 있어요.\n{self.VOTE_AD}"
+            f"✅ 성공적으로 로그 채널을 {f'<#{channel.id}>으로 설정' if channel else '삭제'}했어요.\n{self.VOTE_AD}"
         )
 
     @slash(
@@ -345,7 +348,7 @@ class Setting(LaytheAddonBase, name="설정"):
         setting.welcome_channel = int(channel) if channel else channel
         await self.bot.database.update_guild_setting(setting)
         await ctx.send(
-            f"✅ 성공적으로 환영 채널을 {f'<#{channel.id}>으로 설정' if channel else '삭제'}했어요. 실제 적용까지는 최대 5분 정도 걸릴 수 있어요.\n{self.VOTE_AD}"
+            f"✅ 성공적으로 환영 채널을 {f'<#{channel.id}>으로 설정' if channel else '삭제'}했어요.\n{self.VOTE_AD}"
         )
 
     @slash(
@@ -371,7 +374,7 @@ class Setting(LaytheAddonBase, name="설정"):
         setting.log_channel = int(channel) if channel else channel
         await self.bot.database.update_guild_setting(setting)
         await ctx.send(
-            f"✅ 성공적으로 고정 채널을 {f'<#{channel.id}>으로 설정' if channel else '삭제'}했어요. 실제 적용까지는 최대 5분 정도 걸릴 수 있어요.\n{self.VOTE_AD}"
+            f"✅ 성공적으로 고정 채널을 {f'<#{channel.id}>으로 설정' if channel else '삭제'}했어요.\n{self.VOTE_AD}"
         )
 
     @slash(
@@ -427,7 +430,7 @@ class Setting(LaytheAddonBase, name="설정"):
         await self.bot.database.update_guild_setting(setting)
         names = {"greet": "환영 메시지", "greet_dm": "DM 환영 메시지", "bye": "작별 인사 메시지"}
         await ctx.send(
-            f"✅ 성공적으로 {names[welcome_type]}를 {'설정' if value else '삭제'}했어요. 실제 적용까지는 최대 5분 정도 걸릴 수 있어요.\n{self.VOTE_AD}"
+            f"✅ 성공적으로 {names[welcome_type]}를 {'설정' if value else '삭제'}했어요.\n{self.VOTE_AD}"
         )
 
 
@@ -2,7 +2,7 @@ from asyncio import Task, sleep
 
 from dico import Activity, ActivityTypes
 
-from laythe import LaytheAddonBase, LaytheBot
+from laythe import LaytheAddonBase, LaytheBot, Priority
 
 
 class Tasks(LaytheAddonBase):
@@ -24,8 +24,11 @@ class Tasks(LaytheAddonBase):
                     f"{self.bot.guild_count}개 서버에서 사용",
                 ]
                 for x in texts:
-                    await self.bot.update_presence(
-                        activities=[Activity(name=x, activity_type=ActivityTypes.GAME)]
+                    await self.bot.rest.run(
+                        Priority.PRESENCE,
+                        "presence",
+                        self.bot.update_presence,
+                        activities=[Activity(name=x, activity_type=ActivityTypes.GAME)],
                     )
                     await sleep(15)
             except:
@@ -0,0 +1,87 @@
+"""
+    laythe-v2
+    Copyright (C) 2022 CodeNU
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from laythe.database.models import Level, Setting, Warn  # noqa: E402
+
+SETTING_ROW = {
+    "guild_id": 845587493419212800,
+    "accepted": 1,
+    "custom_prefix": None,
+    "flags": 1,
+    "mute_role": 845587493419212801,
+    "log_channel": 845587493419212802,
+    "welcome_channel": 845587493419212803,
+    "starboard_channel": None,
+    "greet": "{mention}님, 환영해요!",
+    "greet_dm": None,
+    "bye": "{name}님이 나갔어요.",
+    "reward_roles": '{"5": 845587493419212804, "10": 845587493419212805, "20": 845587493419212806}',
+    "warn_actions": '{"3": "mute", "5": "kick"}',
+    "version": 3,
+}
+LEVEL_ROW = {
+    "user_id": 288302173912170497,
+    "guild_id": 845587493419212800,
+    "exp": 12345,
+    "level": 14,
+}
+WARN_ROW = {
+    "guild_id": 845587493419212800,
+    "date": 1650000000,
+    "user_id": 288302173912170497,
+    "mod_id": 288302173912170498,
+    "reason": "spam",
+}
+CASES = [
+    ("Setting", Setting, SETTING_ROW),
+    ("Level", Level, LEVEL_ROW),
+    ("Warn", Warn, WARN_ROW),
+]
+
+
+def construction(cls, row, number: int) -> float:
+    return min(timeit.repeat(lambda: cls(row), number=number, repeat=5)) / number
+
+
+def memory(cls, row, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [cls(row) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{'model':<10}{'construct (us)':>16}{'memory (bytes)':>16}")
+    for name, cls, row in CASES:
+        print(
+            f"{name:<10}{construction(cls, row, number) * 1e6:>16.2f}{memory(cls, row, number):>16.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,22 @@ class Config:
     TESTING_GUILDS: Optional[List[int]] = None
     NOTICE_CHANNEL: int = None
 
+    # Logging
+    # seconds to collect log embeds before sending
+    LOG_BATCH_WINDOW: float = 1.0
+    # queued embeds per log channel before flushing early
+    LOG_BATCH_MAX_QUEUE: int = 50
+
+    # Tracing
+    # seconds before an event handler is logged as slow
+    SLOW_HANDLER_THRESHOLD: float = 1.0
+
+    # Outbound REST
+    # concurrent Discord REST calls made through LaytheBot.rest
+    REST_CONCURRENCY: int = 8
+    # slots kept free for moderation actions and replies
+    REST_RESERVED: int = 2
+
     # Bot List
     KBOT_TOKEN: str = ""
 
@@ -4,6 +4,10 @@ create table levels
     user_id  bigint(30)                not null,
     guild_id bigint(30)                not null,
     exp      bigint unsigned default 0 not null,
-    level    bigint unsigned default 0 not null
+    level    bigint unsigned default 0 not null,
+    primary key (guild_id, user_id)
 );
 
+create index levels_exp
+    on levels (guild_id, exp, user_id);
+
@@ -14,6 +14,7 @@ create table settings
     greet_dm          text                 null,
     bye               text                 null,
     reward_roles      text                 null,
-    warn_actions      text                 null
+    warn_actions      text                 null,
+    version           int        default 0 not null
 );
 
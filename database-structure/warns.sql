@@ -8,3 +8,9 @@ create table warns
     reason   text       not null
 );
 
+create index warns_date
+    on warns (guild_id, date);
+
+create index warns_user
+    on warns (guild_id, user_id);
+
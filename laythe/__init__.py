@@ -16,7 +16,7 @@
 from . import utils
 from .addon import DMNotAllowedAddonBase, LaytheAddonBase
 from .bot import LaytheBot
-from .database import Level, Setting, Warn
+from .database import Level, Setting, SettingConflict, Warn
 from .discord_lang import *
 from .perm import (
     BotPermissionNotFound,
@@ -25,3 +25,4 @@ from .perm import (
     bot_has_perm,
     has_perm,
 )
+from .scheduler import Priority
@@ -0,0 +1,95 @@
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from dico import Embed, Guild
+
+if TYPE_CHECKING:
+    from .bot import LaytheBot
+
+
+class LogQueue:
+    def __init__(self, guild: Guild):
+        self.guild = guild
+        self.items: List[Embed] = []
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup = asyncio.Event()
+        self.space = asyncio.Event()
+
+
+def embed_length(embed: Embed) -> int:
+    data = embed.to_dict()
+    return (
+        len(data.get("title") or "")
+        + len(data.get("description") or "")
+        + len((data.get("footer") or {}).get("text") or "")
+        + len((data.get("author") or {}).get("name") or "")
+        + sum(
+            len(x.get("name") or "") + len(x.get("value") or "")
+            for x in data.get("fields") or []
+        )
+    )
+
+
+class LogBatcher:
+    # Discord's limits per message
+    MAX_EMBEDS = 10
+    MAX_LENGTH = 6000
+
+    def __init__(self, bot: "LaytheBot", window: float, max_queue: int):
+        self.bot = bot
+        self.window = window
+        self.max_queue = max_queue
+        self.queues: Dict[int, LogQueue] = {}
+
+    async def enqueue(self, guild: Guild, channel_id: int, embed: Embed):
+        # Returns once the embed is queued, callers don't wait for the batch window.
+        queue = self.queues.get(channel_id)
+        if not queue:
+            queue = self.queues[channel_id] = LogQueue(guild)
+        while len(queue.items) >= self.max_queue:
+            # Backpressure: flush right away and wait until there is room again.
+            queue.wakeup.set()
+            queue.space.clear()
+            await queue.space.wait()
+        queue.items.append(embed)
+        if len(queue.items) >= self.MAX_EMBEDS:
+            queue.wakeup.set()
+        if not queue.task:
+            queue.task = self.bot.loop.create_task(self.run(channel_id, queue))
+
+    def take_batch(self, queue: LogQueue) -> List[Embed]:
+        # Stop before the combined embed text would go over the limit, the first one always goes.
+        count, length = 0, 0
+        for embed in queue.items[: self.MAX_EMBEDS]:
+            length += embed_length(embed)
+            if count and length > self.MAX_LENGTH:
+                break
+            count += 1
+        batch = queue.items[:count]
+        del queue.items[:count]
+        return batch
+
+    async def run(self, channel_id: int, queue: LogQueue):
+        try:
+            while queue.items:
+                try:
+                    await asyncio.wait_for(queue.wakeup.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+                queue.wakeup.clear()
+                while queue.items:
+                    batch = self.take_batch(queue)
+                    queue.space.set()
+                    try:
+                        await self.bot.send_log(queue.guild, channel_id, embeds=batch)
+                    except Exception:
+                        # Nobody awaits this task, so report and keep draining.
+                        self.bot.laythe_logger.exception(
+                            f"Failed to send {len(batch)} logs to channel {channel_id}."
+                        )
+        finally:
+            queue.task = None
+            if queue.items:
+                queue.task = self.bot.loop.create_task(self.run(channel_id, queue))
+            elif self.queues.get(channel_id) is queue:
+                del self.queues[channel_id]
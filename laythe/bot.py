@@ -1,18 +1,24 @@
+import asyncio
 import datetime
+import time
 from contextlib import suppress
 from logging import Logger
-from typing import Optional, Union
+from typing import Dict, Optional, Set, Union
 
-from dico import AllowedMentions, Embed, Guild, GuildMember, Intents, User
-from dico.exception import HTTPError
-from dico_command import Bot, Message
+from dico import AllowedMentions, Embed, Guild, GuildMember, Intents, User, Webhook
+from dico.exception import HTTPError, NotFound
+from dico_command import Addon, Bot, Message
 from dico_interaction import AutoComplete, ComponentCallback
 from dico_interaction import InteractionClient as InteractionBase
 from dico_interaction import InteractionCommand, InteractionContext
 
 from config import Config
 
-from .database import LaytheDB, Warn
+from .batcher import LogBatcher
+from .database import LaytheDB, SchemaOutdated, Warn, verify_schema
+from .metrics import GATEWAY_EVENTS, REGISTRY
+from .scheduler import Priority, RESTScheduler
+from .tracing import HandlerTracer
 from .utils import EmbedColor, kstnow
 
 try:
@@ -37,6 +43,7 @@ class InteractionClient(InteractionBase):
     ):
         if isinstance(target, InteractionCommand) and not interaction.guild_id:
             return await interaction.send("❌ 명령어는 DM에서 사용할 수 없어요.")
+        await self.client.database_ready.wait()
         return await super().handle_interaction(target, interaction)
 
 
@@ -56,11 +63,27 @@ class LaytheBot(Bot):
             monoshard=Config.MONO_SHARD,
         )
         self.laythe_logger = logger
+        self.database_ready = asyncio.Event()
+        self.ready_guild_ids: Set[int] = set()
+        self.log_webhooks: Dict[int, Webhook] = {}
+        self.rest = RESTScheduler(
+            getattr(Config, "REST_CONCURRENCY", 8),
+            getattr(Config, "REST_RESERVED", 2),
+        )
+        self.log_batcher = LogBatcher(
+            self,
+            getattr(Config, "LOG_BATCH_WINDOW", 1.0),
+            getattr(Config, "LOG_BATCH_MAX_QUEUE", 50),
+        )
+        self.tracer = HandlerTracer(
+            logger, getattr(Config, "SLOW_HANDLER_THRESHOLD", 1.0)
+        )
         InteractionClient(
             client=self,
             guild_ids_lock=Config.TESTING_GUILDS,
             auto_register_commands=bool(Config.TESTING_GUILDS),
         )
+        self.register_metrics()
         self.loop.create_task(self.setup_bot())
         self.klist = (
             KListClient(self, Config.KBOT_TOKEN, self.http.session)
@@ -84,6 +107,19 @@ class LaytheBot(Bot):
             login_pw=Config.DB_PW,
             db_name=Config.DB_NAME,
         )
+        try:
+            await verify_schema(self.database)
+        except SchemaOutdated as ex:
+            self.laythe_logger.critical(str(ex))
+            await self.close()
+            return
+        try:
+            await self.warm_up()
+        except Exception:
+            # Everything warmed here is also loaded lazily, so keep going without it.
+            self.laythe_logger.exception("Failed to warm up the database caches.")
+        finally:
+            self.database_ready.set()
         if self.klist and not Config.DEBUG:
             self.klist.create_guild_count_task()
         if self.nugrid:
@@ -93,6 +129,81 @@ class LaytheBot(Bot):
             }
             self.loop.create_task(self.nugrid.start())
 
+    async def warm_up(self):
+        await self.database.warm_flag_guilds()
+        start = time.perf_counter()
+        guild_ids = self.ready_guild_ids | {
+            int(x["value"].id) for x in self.cache.get_storage("guild")
+        }
+        count = await self.database.preload_guild_settings(guild_ids)
+        self.laythe_logger.info(
+            f"Preloaded {count} settings for {len(guild_ids)} guilds in {time.perf_counter() - start:.2f}s."
+        )
+
+    def register_metrics(self):
+        def cache_stats(attr: str):
+            if not hasattr(self, "database"):
+                return []
+            return [
+                (("settings",), getattr(self.database.settings_cache, attr)),
+                (("level_cooldown",), getattr(self.database.level_cooldown, attr)),
+                (("rank",), getattr(self.database.rank_cache, attr)),
+            ]
+
+        REGISTRY.callback(
+            "laythe_cache_hits_total",
+            "Cache hits.",
+            "counter",
+            ("cache",),
+            lambda: cache_stats("hits"),
+        )
+        REGISTRY.callback(
+            "laythe_cache_misses_total",
+            "Cache misses.",
+            "counter",
+            ("cache",),
+            lambda: cache_stats("misses"),
+        )
+        REGISTRY.callback(
+            "laythe_rest_queued",
+            "Outbound REST calls waiting for a slot.",
+            "gauge",
+            ("priority",),
+            lambda: [((k.name.lower(),), v.queued) for k, v in self.rest.stats.items()],
+        )
+        REGISTRY.callback(
+            "laythe_log_queued",
+            "Log embeds waiting to be batched.",
+            "gauge",
+            (),
+            lambda: [((), sum(len(x.items) for x in self.log_batcher.queues.values()))],
+        )
+
+    def dispatch(self, name: str, *args):
+        # RAW repeats every payload and shards_ready is internal, neither is a gateway event.
+        if name.lower() not in ("raw", "shards_ready"):
+            GATEWAY_EVENTS.inc(event=name.lower())
+        if name.lower() == "ready" and args:
+            # Guilds arrive lazily after READY, keep its ID list for the settings preload.
+            self.ready_guild_ids.update(
+                int(x["id"]) for x in getattr(args[0], "guilds", None) or []
+            )
+        return super().dispatch(name, *args)
+
+    def register_addons(self, *addons: Addon):
+        for addon in addons:
+            for listener in addon.listeners:
+                listener.func = self.wait_database(self.tracer.wrap(addon, listener))
+        super().register_addons(*addons)
+
+    def wait_database(self, func):
+        async def wrap(*args, **kwargs):
+            if not self.database_ready.is_set():
+                await self.database_ready.wait()
+            return await func(*args, **kwargs)
+
+        return wrap
+
     async def get_prefix(self, message: Message):
         await self.wait_ready()
         if message.content.split()[0] in [f"<@{self.user.id}>", f"<@!{self.user.id}>"]:
@@ -100,23 +211,60 @@ class LaytheBot(Bot):
         else:
             return [f"<@{self.user.id}>", f"<@!{self.user.id}>"]
 
-    async def execute_log(self, guild: Guild, **kwargs):
+    async def request_log_webhook(self, channel_id: int) -> Webhook:
+        webhook = self.log_webhooks.get(channel_id)
+        if webhook:
+            return webhook
+        webhooks = await self.rest.run(
+            Priority.LOGGING,
+            f"channel:{channel_id}",
+            self.request_channel_webhooks,
+            channel_id,
+        )
+        filtered = [
+            *filter(lambda w: w.user == self.user and w.name == "서버 로깅", webhooks)
+        ]
+        if not filtered:
+            webhook = await self.rest.run(
+                Priority.LOGGING,
+                f"channel:{channel_id}",
+                self.create_webhook,
+                channel_id,
+                name="서버 로깅",
+            )
+        else:
+            webhook = filtered[0]
+        self.log_webhooks[channel_id] = webhook
+        return webhook
+
+    async def execute_log(self, guild: Guild, batch: bool = True, **kwargs):
         setting = await self.database.request_guild_setting(int(guild))
         if not setting.log_channel:
             return
+        if batch and kwargs.keys() == {"embed"}:
+            # Batched logs return once queued, there is no message to hand back.
+            return await self.log_batcher.enqueue(
+                guild, setting.log_channel, kwargs["embed"]
+            )
+        return await self.send_log(guild, setting.log_channel, **kwargs)
+
+    async def send_log(self, guild: Guild, channel_id: int, **kwargs):
+        kwargs["username"] = guild.name
+        kwargs["avatar_url"] = guild.icon_url()
         with suppress(HTTPError):  # ignore sending failure
-            # TODO: use cache?
-            webhooks = await self.request_channel_webhooks(setting.log_channel)
-            filtered = [
-                *filter(lambda w: w.user == self.user and w.name == "서버 로깅", webhooks)
-            ]
-            if not filtered:
-                webhook = await self.create_webhook(setting.log_channel, name="서버 로깅")
-            else:
-                webhook = webhooks[0]
-            kwargs["username"] = guild.name
-            kwargs["avatar_url"] = guild.icon_url()
-            return await webhook.execute(**kwargs)
+            route = f"webhook:{channel_id}"
+            webhook = await self.request_log_webhook(channel_id)
+            try:
+                return await self.rest.run(
+                    Priority.LOGGING, route, webhook.execute, **kwargs
+                )
+            except NotFound:
+                # The webhook was deleted without us noticing, fetch it again.
+                self.log_webhooks.pop(channel_id, None)
+                webhook = await self.request_log_webhook(channel_id)
+                return await self.rest.run(
+                    Priority.LOGGING, route, webhook.execute, **kwargs
+                )
 
     async def add_warn(
         self,
@@ -141,9 +289,16 @@ class LaytheBot(Bot):
             actions = settings.warn_actions.as_dict()
             action = actions.get(str(len(warns)), "")
             with suppress(HTTPError):
+                route = f"guild:{int(guild)}"
                 if action == "mute" and settings.mute_role:
-                    await self.add_guild_member_role(
-                        guild, user, settings.mute_role, reason="경고 액션"
+                    await self.rest.run(
+                        Priority.MODERATION,
+                        route,
+                        self.add_guild_member_role,
+                        guild,
+                        user,
+                        settings.mute_role,
+                        reason="경고 액션",
                     )
                     warn_action = "뮤트 역할 추가"
                 elif action.startswith("timeout"):
@@ -154,15 +309,28 @@ class LaytheBot(Bot):
                         else datetime.timedelta(hours=1)
                     )
                     end_at = datetime.datetime.utcnow() + delta
-                    await self.modify_guild_member(
-                        guild, user, communication_disabled_until=end_at
+                    await self.rest.run(
+                        Priority.MODERATION,
+                        route,
+                        self.modify_guild_member,
+                        guild,
+                        user,
+                        communication_disabled_until=end_at,
                     )
                     warn_action = f"{f'{days}일' if days else '1시간'} 타임아웃"
                 elif action == "kick":
-                    await self.remove_guild_member(guild, user)
+                    await self.rest.run(
+                        Priority.MODERATION,
+                        route,
+                        self.remove_guild_member,
+                        guild,
+                        user,
+                    )
                     warn_action = "추방"
                 elif action == "ban":
-                    await self.create_guild_ban(guild, user)
+                    await self.rest.run(
+                        Priority.MODERATION, route, self.create_guild_ban, guild, user
+                    )
                     warn_action = "차단"
         cached_guild = self.get_guild(int(guild))
         cached_target, cached_manager = None, None
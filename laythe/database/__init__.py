@@ -13,5 +13,6 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from .database import LaytheDB
+from .database import LaytheDB, SettingConflict
+from .migration import SchemaOutdated, migrate, verify_schema
 from .models import Level, Setting, Warn
@@ -2,42 +2,11 @@ import json
 from typing import Dict, Optional
 
 import aiomysql
-import aiosqlite
-
-
-class Cache:
-    def __init__(self, db: aiosqlite.Connection):
-        self.db = db
-
-    @classmethod
-    async def create(cls):
-        db = await aiosqlite.connect(":memory:")
-        db.row_factory = aiosqlite.Row
-        return cls(db)
-
-    async def close(self):
-        await self.db.close()
-
-    async def execute(self, sql: str, param: iter = None):
-        await self.db.execute(sql, param)
-        await self.db.commit()
-
-    async def execute_many(self, sql: str, params: iter = None):
-        await self.db.executemany(sql, params)
-        await self.db.commit()
-
-    async def fetch(self, sql: str, param: iter = None, return_raw=False) -> list:
-        async with self.db.execute(sql, param) as cur:
-            rows = await cur.fetchall()
-            if not return_raw:
-                return [dict(x) for x in rows]
-            return [x for x in rows]
 
 
 class BaseDatabase:
-    def __init__(self, pool: aiomysql.Pool, cache: Cache):
+    def __init__(self, pool: aiomysql.Pool):
         self.pool = pool
-        self.cache = cache
 
     @classmethod
     async def login(
@@ -47,7 +16,6 @@ class BaseDatabase:
         login_id: str,
         login_pw: str,
         db_name: str,
-        use_cache: bool = True,
     ):
         connection = dict(
             host=host,
@@ -58,24 +26,23 @@ class BaseDatabase:
             db=db_name,
         )
         pool = await aiomysql.create_pool(**connection, autocommit=True)
-        cache = (await Cache.create()) if use_cache else None
-        self = cls(pool, cache)
-        if use_cache:
-            await self.on_cache_load()
-        return self
-
-    async def on_cache_load(self):
-        pass
+        return cls(pool)
 
     async def close(self):
         if self.pool:
             self.pool.close()
             await self.pool.wait_closed()
 
-    async def execute(self, sql: str, param: tuple = None):
+    async def execute(self, sql: str, param: tuple = None) -> int:
         async with self.pool.acquire() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(sql, param)
+                return cur.rowcount
+
+    async def execute_many(self, sql: str, params: list):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(sql, params)
 
     async def fetch(self, sql: str, param: tuple = None):
         async with self.pool.acquire() as conn:
@@ -85,10 +52,19 @@ class BaseDatabase:
 
 
 class BaseFlag:
-    def __init__(self, *args, **kwargs):
-        self.values = {
-            x: getattr(self, x) for x in dir(self) if isinstance(getattr(self, x), int)
+    __slots__ = ("value",)
+    values: Dict[str, int] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Built once per flag class instead of on every instance.
+        cls.values = {
+            x: getattr(cls, x)
+            for x in dir(cls)
+            if not x.startswith("_") and isinstance(getattr(cls, x), int)
         }
+
+    def __init__(self, *args, **kwargs):
         self.value = 0
         for x in args:
             if x.upper() not in self.values:
@@ -143,23 +119,42 @@ class BaseFlag:
 
 
 class JSONStrInt:
+    __slots__ = ("__raw", "__data")
+
     def __init__(self, data: str):
-        self.__data: Dict[str, int] = json.loads(data)
+        # Decoded on first use, most events never look at these.
+        # The raw string is kept until an edit, so reading never marks the column as changed.
+        self.__raw: Optional[str] = data
+        self.__data: Optional[Dict[str, int]] = None
+
+    def __items(self) -> Dict[str, int]:
+        if self.__data is None:
+            self.__data = json.loads(self.__raw)
+        return self.__data
+
+    def validate(self):
+        # Rows from the DB are trusted and decoded lazily, outside input is checked right away.
+        if not isinstance(self.__items(), dict):
+            raise ValueError("expected a JSON object")
 
     def __getitem__(self, item) -> Optional[int]:
-        return self.__data.get(str(item))
+        return self.__items().get(str(item))
 
     def __setitem__(self, key, value):
-        self.__data[str(key)] = int(value)
+        self.__items()[str(key)] = int(value)
+        self.__raw = None
 
     def __delitem__(self, key):
-        del self.__data[str(key)]
+        del self.__items()[str(key)]
+        self.__raw = None
 
     def __bool__(self):
-        return bool(self.__data)
+        return bool(self.__items())
 
     def as_dict(self) -> dict:
-        return self.__data
+        return self.__items()
 
     def to_str(self) -> str:
+        if self.__raw is not None:
+            return self.__raw
         return json.dumps(self.__data)
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .models import Level
+
+if TYPE_CHECKING:
+    from .database import LaytheDB
+
+
+class LevelBuffer:
+    def __init__(
+        self,
+        database: "LaytheDB",
+        flush_interval: float,
+        max_pending: int,
+        idle_timeout: float,
+    ):
+        self.database = database
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self.lock = asyncio.Lock()
+        self.__levels: Dict[Tuple[int, int], Level] = {}
+        self.__pending: Dict[Tuple[int, int], int] = {}
+        self.__last_used: Dict[Tuple[int, int], float] = {}
+        self.__task: Optional[asyncio.Task] = None
+        self.__flush_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self.__pending)
+
+    async def get(self, guild_id: int, user_id: int) -> Level:
+        key = (guild_id, user_id)
+        level = self.__levels.get(key)
+        if level is None:
+            level = await self.database.request_level(
+                guild_id, user_id
+            ) or Level.create(user_id, guild_id, 0, 0)
+            level = self.__levels.setdefault(key, level)
+        self.__last_used[key] = time.monotonic()
+        return level
+
+    def peek(self, guild_id: int, user_id: int) -> Optional[Level]:
+        return self.__levels.get((guild_id, user_id))
+
+    def guild_levels(self, guild_id: int) -> List[Level]:
+        return [v for k, v in self.__levels.items() if k[0] == guild_id]
+
+    def add_exp(self, level: Level, exp: int):
+        key = (level.guild_id, level.user_id)
+        level.exp += exp
+        self.database.update_rank(level)
+        self.__levels[key] = level
+        self.__pending[key] = self.__pending.get(key, 0) + exp
+        self.__last_used[key] = time.monotonic()
+        if self.__task is None:
+            self.__task = asyncio.get_event_loop().create_task(self.__flush_loop())
+        if len(self.__pending) >= self.max_pending and (
+            self.__flush_task is None or self.__flush_task.done()
+        ):
+            self.__flush_task = asyncio.get_event_loop().create_task(
+                self.__safe_flush()
+            )
+
+    def discard(self, guild_id: int, user_id: Optional[int] = None):
+        for key in [
+            x
+            for x in self.__levels
+            if x[0] == guild_id and (not user_id or x[1] == user_id)
+        ]:
+            del self.__levels[key]
+            self.__pending.pop(key, None)
+            self.__last_used.pop(key, None)
+
+    async def flush(self):
+        async with self.lock:
+            pending, self.__pending = self.__pending, {}
+            rows = [
+                (x, exp, self.__levels[x].level)
+                for x, exp in pending.items()
+                if x in self.__levels
+            ]
+            # Drop rows idle for longer than the timeout to keep memory flat.
+            expired_at = time.monotonic() - self.idle_timeout
+            for key in [
+                k
+                for k, v in self.__last_used.items()
+                if v < expired_at and k not in pending
+            ]:
+                self.__levels.pop(key, None)
+                del self.__last_used[key]
+            if not rows:
+                return
+            try:
+                await self.database.increment_levels(rows)
+            except Exception:
+                for key, exp in pending.items():
+                    self.__pending[key] = self.__pending.get(key, 0) + exp
+                raise
+
+    async def __safe_flush(self):
+        try:
+            await self.flush()
+        except Exception:
+            from traceback import print_exc
+
+            print_exc()
+
+    async def __flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.__safe_flush()
+
+    async def close(self):
+        if self.__task:
+            self.__task.cancel()
+            self.__task = None
+        await self.flush()
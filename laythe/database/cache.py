@@ -0,0 +1,114 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        weigher: Optional[Callable[[V], int]] = None,
+    ):
+        # Without a weigher max_size counts entries, otherwise the summed weights.
+        self.max_size = max_size
+        self.ttl = ttl
+        self.weigher = weigher
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self.__data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self.__weights: Dict[K, int] = {}
+
+    def __len__(self):
+        return len(self.__data)
+
+    def __weigh(self, key: K, value: Optional[V]):
+        weight = 0 if value is None else self.weigher(value) if self.weigher else 1
+        self.size += weight - self.__weights.pop(key, 0)
+        if value is not None:
+            self.__weights[key] = weight
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self.__data.get(key)
+        if entry is None:
+            self.misses += 1
+            return
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.__data[key]
+            self.__weigh(key, None)
+            self.misses += 1
+            return
+        self.__data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: K) -> Optional[V]:
+        entry = self.__data.get(key)
+        if entry and entry[0] >= time.monotonic():
+            return entry[1]
+
+    def set(self, key: K, value: V):
+        self.__data[key] = (time.monotonic() + self.ttl, value)
+        self.__data.move_to_end(key)
+        self.__weigh(key, value)
+        # The newest entry always stays, even when it alone is over the limit.
+        while self.size > self.max_size and len(self.__data) > 1:
+            self.__weigh(self.__data.popitem(last=False)[0], None)
+
+    def pop(self, key: K) -> Optional[V]:
+        entry = self.__data.pop(key, None)
+        if entry:
+            self.__weigh(key, None)
+            return entry[1]
+
+    def clear(self):
+        self.__data.clear()
+        self.__weights.clear()
+        self.size = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class Cooldown(Generic[K]):
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.hits = 0
+        self.misses = 0
+        self.__last: Dict[K, float] = {}
+        self.__last_purge = time.monotonic()
+
+    def __len__(self):
+        return len(self.__last)
+
+    def hit(self, key: K) -> bool:
+        now = time.monotonic()
+        if now - self.__last_purge > self.rate:
+            self.purge(now)
+        last = self.__last.get(key)
+        if last is not None and now - last < self.rate:
+            self.hits += 1
+            return False
+        self.misses += 1
+        # Re-insert so the dict stays ordered by timestamp for purge.
+        self.__last.pop(key, None)
+        self.__last[key] = now
+        return True
+
+    def purge(self, now: Optional[float] = None):
+        now = now or time.monotonic()
+        expired = []
+        for key, last in self.__last.items():
+            if now - last < self.rate:
+                break
+            expired.append(key)
+        for key in expired:
+            del self.__last[key]
+        self.__last_purge = now
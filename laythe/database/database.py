@@ -1,81 +1,191 @@
-import json
-import time
-from typing import Any, List, Optional
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
+from ..metrics import timed_query
 from .base import BaseDatabase
-from .models import Level, Setting, Warn
+from .buffer import LevelBuffer
+from .cache import Cooldown, TTLCache
+from .models import LaytheSettingFlags, Level, Setting, Warn
+from .rank import RankIndex
+
+
+class SettingConflict(Exception):
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        super().__init__(
+            f"settings of guild {guild_id} were changed by another writer."
+        )
 
 
 class LaytheDB(BaseDatabase):
-    MAX_CACHE_VALID = 60 * 5  # 5 min
+    MAX_CACHE_VALID = 60 * 60  # 1 hour, writes go through the cache
+    MAX_SETTINGS_CACHE = 10000
+    SETTINGS_PRELOAD_CHUNK = 500
 
-    async def on_cache_load(self):
-        await self.cache.execute(
-            """CREATE TABLE IF NOT EXISTS settings_cache
-        ("guild_id" INTEGER NOT NULL PRIMARY KEY,
-         "data" TEXT NOT NULL,
-         "last_update_at" INTEGER NOT NULL)"""
-        )
-        await self.cache.execute(
-            """CREATE TABLE IF NOT EXISTS level_cache ("guild_id" INTEGER NOT NULL, "user_id"INTEGER NOT NULL, "last_message_timestamp"INTEGER NOT NULL)"""
-        )
+    LEVEL_COOLDOWN = 60
+    LEVEL_FLUSH_INTERVAL = 30
+    LEVEL_FLUSH_SIZE = 500
+    MAX_RANK_ENTRIES = 1000000  # members across all cached rank indexes
 
-    async def maybe_cache(self, key: str, value: Any, table: str) -> Optional[Any]:
-        resp = await self.cache.fetch(
-            f"""SELECT * FROM {table}_cache WHERE {key}=?""", (value,)
+    def __init__(self, pool):
+        super().__init__(pool)
+        self.settings_cache: TTLCache[int, Setting] = TTLCache(
+            self.MAX_SETTINGS_CACHE, self.MAX_CACHE_VALID
         )
-        if not resp:
-            return
-        resp = resp[0]
-        last_update_at = resp["last_update_at"]
-        if time.time() - last_update_at > self.MAX_CACHE_VALID:
-            return
-        return resp["data"]
-
-    async def update_cache(self, value: Any, table: str, data: Any):
-        await self.cache.execute(
-            f"""INSERT OR REPLACE INTO {table}_cache VALUES(?, ?, ?)""",
-            (value, data, int(time.time())),
+        self.settings_writes = 0
+        self.__setting_loads: Dict[int, "asyncio.Task[Tuple[Setting, dict]]"] = {}
+        # Guilds with each setting flag on, None until warmed so every guild takes the slow path.
+        self.flag_guilds: Optional[Dict[str, Set[int]]] = None
+        self.level_cooldown: Cooldown[Tuple[int, int]] = Cooldown(self.LEVEL_COOLDOWN)
+        self.level_buffer = LevelBuffer(
+            self,
+            self.LEVEL_FLUSH_INTERVAL,
+            self.LEVEL_FLUSH_SIZE,
+            # Active users come back every cooldown, keep them well past that.
+            self.LEVEL_COOLDOWN * 2,
         )
-
-    async def reset_cache(self, key: str, value: Any, table: str):
-        await self.cache.execute(
-            f"""DELETE FROM {table}_cache WHERE {key}=?""", (value,)
+        self.rank_cache: TTLCache[int, RankIndex] = TTLCache(
+            self.MAX_RANK_ENTRIES, self.MAX_CACHE_VALID, len
         )
+        self.__rank_loads: Dict[int, "asyncio.Task[RankIndex]"] = {}
+
+    async def close(self):
+        await self.level_buffer.close()
+        await super().close()
 
     async def request_guild_setting(
         self, guild_id: int, bypass_cache: bool = False
     ) -> Optional[Setting]:
         if not bypass_cache:
-            maybe_cache = await self.maybe_cache("guild_id", guild_id, "settings")
-            if maybe_cache:
-                return Setting(json.loads(maybe_cache))
+            cached = self.settings_cache.get(guild_id)
+            if cached:
+                return cached
+        # Concurrent misses for the same guild share one load.
+        task = self.__setting_loads.get(guild_id)
+        if not task:
+            task = asyncio.get_event_loop().create_task(self.__load_setting(guild_id))
+            self.__setting_loads[guild_id] = task
+            task.add_done_callback(lambda x: self.__forget_setting_load(guild_id, x))
+        setting, resp = await asyncio.shield(task)
+        # bypass_cache callers modify the returned object, so give them their own copy.
+        return Setting(resp) if bypass_cache else setting
+
+    async def __load_setting(self, guild_id: int) -> Tuple[Setting, dict]:
+        writes = self.settings_writes
+        # Guilds without a row use the defaults in memory, the row is created on first save.
+        resp = (
+            await self.load_guild_setting(guild_id)
+            or Setting.create(guild_id).to_dict()
+        )
+        setting = Setting(resp)
+        # Don't cache a row that a concurrent write may have already replaced.
+        if writes == self.settings_writes:
+            self.track_flags(guild_id, setting.flags.value)
+            self.settings_cache.set(guild_id, setting)
+        return setting, resp
+
+    def __forget_setting_load(self, guild_id: int, task: asyncio.Task):
+        if self.__setting_loads.get(guild_id) is task:
+            del self.__setting_loads[guild_id]
+
+    @timed_query
+    async def preload_guild_settings(self, guild_ids: Iterable[int]) -> int:
+        guild_ids = list(guild_ids)[: self.MAX_SETTINGS_CACHE]
+        count = 0
+        for i in range(0, len(guild_ids), self.SETTINGS_PRELOAD_CHUNK):
+            chunk = guild_ids[i : i + self.SETTINGS_PRELOAD_CHUNK]
+            writes = self.settings_writes
+            resp = await self.fetch(
+                f"SELECT * FROM settings WHERE guild_id IN ({', '.join(['%s'] * len(chunk))})",
+                tuple(chunk),
+            )
+            if writes != self.settings_writes:
+                continue
+            settings = {x: Setting.create(x) for x in chunk}
+            settings.update((int(x["guild_id"]), Setting(x)) for x in resp)
+            for guild_id, setting in settings.items():
+                self.settings_cache.set(guild_id, setting)
+                self.track_flags(guild_id, setting.flags.value)
+            count += len(resp)
+        return count
+
+    @timed_query
+    async def load_guild_setting(self, guild_id: int) -> Optional[dict]:
         resp = await self.fetch("SELECT * FROM settings WHERE guild_id=%s", (guild_id,))
         if resp:
-            await self.update_cache(guild_id, "settings", json.dumps(resp[0]))
-            return Setting(resp[0])
-        else:
-            await self.reset_guild_setting(guild_id)
-            return await self.request_guild_setting(guild_id)
+            return resp[0]
 
-    async def update_guild_setting(self, data: Setting):
-        data = data.to_dict()
-        guild_id = data.pop("guild_id")
+    def invalidate_guild_setting(self, guild_id: int):
+        self.settings_writes += 1
+        self.settings_cache.pop(guild_id)
+        # Later callers must not join a load that started before this write.
+        self.__setting_loads.pop(guild_id, None)
+        # The new flags are unknown until the next load, assume everything is on until then.
+        if self.flag_guilds is not None:
+            for guilds in self.flag_guilds.values():
+                guilds.add(guild_id)
 
-        # TODO: better method?
-        inject = ", ".join([f"{x}=%s" for x in data.keys()])
-        await self.execute(
-            f"UPDATE settings SET {inject} WHERE guild_id=%s",
-            (*data.values(), guild_id),
+    def has_flag(self, guild_id: int, name: str) -> bool:
+        return self.flag_guilds is None or guild_id in self.flag_guilds[name.upper()]
+
+    def track_flags(self, guild_id: int, value: int):
+        if self.flag_guilds is None:
+            return
+        flags = LaytheSettingFlags.from_value(value)
+        for name, guilds in self.flag_guilds.items():
+            if flags.has(name):
+                guilds.add(guild_id)
+            else:
+                guilds.discard(guild_id)
+
+    @timed_query
+    async def warm_flag_guilds(self):
+        flag_guilds = {x: set() for x in LaytheSettingFlags.values}
+        resp = await self.fetch("SELECT guild_id, flags FROM settings WHERE flags<>0")
+        for row in resp:
+            flags = LaytheSettingFlags.from_value(row["flags"])
+            for name, guilds in flag_guilds.items():
+                if flags.has(name):
+                    guilds.add(int(row["guild_id"]))
+        self.flag_guilds = flag_guilds
+
+    @timed_query
+    async def update_guild_setting(self, data: Setting):
+        changes = data.changes()
+        if not changes:
+            return
+        guild_id = data.guild_id
+        inject = ", ".join([f"{x}=%s" for x in changes.keys()])
+        self.invalidate_guild_setting(guild_id)
+        try:
+            if not data.version:
+                # Guilds still on the in-memory defaults don't have a row yet.
+                await self.execute(
+                    "INSERT IGNORE INTO settings (guild_id) VALUES (%s)", (guild_id,)
+                )
+            updated = await self.execute(
+                f"UPDATE settings SET {inject}, version=version+1 WHERE guild_id=%s AND version=%s",
+                (*changes.values(), guild_id, data.version),
+            )
+        finally:
+            self.settings_writes += 1
+        if not updated:
+            raise SettingConflict(guild_id)
+        self.settings_cache.set(
+            guild_id, Setting({**data.to_dict(), "version": data.version + 1})
         )
+        self.track_flags(guild_id, data.flags.value)
 
+    @timed_query
     async def delete_guild_setting(self, guild_id: int):
-        await self.execute("DELETE FROM settings WHERE guild_id=%s", (guild_id,))
-
-    async def reset_guild_setting(self, guild_id: int):
-        await self.delete_guild_setting(guild_id)
-        await self.execute("INSERT INTO settings(guild_id) VALUES (%s)", (guild_id,))
+        self.invalidate_guild_setting(guild_id)
+        try:
+            await self.execute("DELETE FROM settings WHERE guild_id=%s", (guild_id,))
+        finally:
+            self.settings_writes += 1
+        self.track_flags(guild_id, 0)
 
+    @timed_query
     async def request_guild_warns(
         self, guild_id: int, user_id: Optional[int] = None
     ) -> Optional[List[Warn]]:
@@ -87,6 +197,7 @@ class LaytheDB(BaseDatabase):
         if resp:
             return [Warn(x) for x in resp]
 
+    @timed_query
     async def request_guild_warn(self, guild_id: int, date: int) -> Optional[Warn]:
         resp = await self.fetch(
             "SELECT * FROM warns WHERE guild_id=%s AND date=%s", (guild_id, date)
@@ -94,18 +205,21 @@ class LaytheDB(BaseDatabase):
         if resp:
             return Warn(resp[0])
 
+    @timed_query
     async def add_guild_warn(self, data: Warn):
         data = data.to_dict()
         await self.execute(
             "INSERT INTO warns VALUES (%s, %s, %s, %s, %s)", (*data.values(),)
         )
 
+    @timed_query
     async def remove_guild_warn(self, data: Warn):
         await self.execute(
             "DELETE FROM warns WHERE guild_id=%s AND user_id=%s AND mod_id=%s AND date=%s",
             (data.guild_id, data.user_id, data.mod_id, data.date),
         )
 
+    @timed_query
     async def request_guild_rank(self, guild_id: int) -> Optional[List[Level]]:
         resp = await self.fetch(
             "SELECT *, RANK() OVER (PARTITION BY guild_id ORDER BY exp DESC) AS _rank FROM levels WHERE guild_id=%s ORDER BY exp DESC",
@@ -114,56 +228,138 @@ class LaytheDB(BaseDatabase):
         if resp:
             return [Level(x) for x in resp]
 
+    @timed_query
     async def request_level(self, guild_id: int, user_id: int) -> Optional[Level]:
         resp = await self.fetch(
-            "SELECT * FROM (SELECT *, RANK() OVER (PARTITION BY guild_id ORDER BY exp DESC) AS _rank FROM levels WHERE guild_id=%s) _levels WHERE user_id=%s",
+            "SELECT * FROM levels WHERE guild_id=%s AND user_id=%s",
             (guild_id, user_id),
         )
         if resp:
             return Level(resp[0])
-        else:
-            await self.execute(
-                "INSERT INTO levels VALUES (%s, %s, %s, %s)", (user_id, guild_id, 0, 0)
+
+    async def request_rank_index(self, guild_id: int) -> RankIndex:
+        cached = self.rank_cache.get(guild_id)
+        if cached is not None:
+            return cached
+        task = self.__rank_loads.get(guild_id)
+        if not task:
+            task = self.__rank_loads[guild_id] = asyncio.get_event_loop().create_task(
+                self.__load_rank_index(guild_id)
             )
-            return Level.create(user_id, guild_id, 0, 0)
+            task.add_done_callback(lambda _: self.__rank_loads.pop(guild_id, None))
+        return await asyncio.shield(task)
 
-    async def update_level(self, data: Level):
-        data = data.to_dict()
-        guild_id = data.pop("guild_id")
-        user_id = data.pop("user_id")
+    async def __load_rank_index(self, guild_id: int) -> RankIndex:
+        index = RankIndex(await self.load_level_exps(guild_id))
+        # Buffered exp isn't flushed yet, the buffer holds the latest totals.
+        for level in self.level_buffer.guild_levels(guild_id):
+            index.update(level.user_id, level.exp)
+        self.rank_cache.set(guild_id, index)
+        return index
 
-        # TODO: better method?
-        inject = ", ".join([f"{x}=%s" for x in data.keys()])
-        await self.execute(
-            f"UPDATE levels SET {inject} WHERE guild_id=%s AND user_id=%s",
-            (*data.values(), guild_id, user_id),
+    @timed_query
+    async def load_level_exps(self, guild_id: int) -> List[Tuple[int, int]]:
+        resp = await self.fetch(
+            "SELECT user_id, exp FROM levels WHERE guild_id=%s", (guild_id,)
         )
+        return [(x["user_id"], x["exp"]) for x in resp]
 
-    async def reset_level(self, guild_id: int, user_id: int = None):
-        param = [guild_id]
-        if user_id:
-            param.append(user_id)
-        await self.execute(
-            f"DELETE FROM levels WHERE guild_id=%s{' AND user_id=%s' if user_id else ''}",
-            tuple(param),
-        )
+    def update_rank(self, level: Level):
+        index = self.rank_cache.peek(level.guild_id)
+        if index is not None:
+            index.update(level.user_id, level.exp)
 
-    async def get_last_message_timestamp(
-        self, guild_id: int, user_id: int
-    ) -> Optional[int]:
-        resp = await self.cache.fetch(
-            "SELECT last_message_timestamp FROM level_cache WHERE guild_id=? AND user_id=?",
-            (guild_id, user_id),
+    @timed_query
+    async def request_level_count(self, guild_id: int) -> int:
+        resp = await self.fetch(
+            "SELECT COUNT(*) AS total FROM levels WHERE guild_id=%s", (guild_id,)
         )
-        if resp:
-            return resp[0]["last_message_timestamp"]
+        return resp[0]["total"]
 
-    async def update_last_message_timestamp(self, guild_id: int, user_id: int):
-        await self.cache.execute(
-            "DELETE FROM level_cache WHERE guild_id=? AND user_id=?",
-            (guild_id, user_id),
+    @timed_query
+    async def request_leaderboard(
+        self, guild_id: int, after: Optional[Tuple[int, int]] = None, limit: int = 50
+    ) -> List[Level]:
+        # Keyset pagination on (exp, user_id), both descending so it walks levels_exp backwards.
+        if after:
+            resp = await self.fetch(
+                "SELECT * FROM levels WHERE guild_id=%s AND (exp<%s OR (exp=%s AND user_id<%s)) "
+                "ORDER BY exp DESC, user_id DESC LIMIT %s",
+                (guild_id, after[0], after[0], after[1], limit),
+            )
+        else:
+            resp = await self.fetch(
+                "SELECT * FROM levels WHERE guild_id=%s ORDER BY exp DESC, user_id DESC LIMIT %s",
+                (guild_id, limit),
+            )
+        levels = [Level(x) for x in resp]
+        if not levels:
+            return levels
+        first = levels[0]
+        resp = await self.fetch(
+            "SELECT COUNT(*) AS ahead, COALESCE(SUM(exp>%s), 0) AS higher FROM levels "
+            "WHERE guild_id=%s AND (exp>%s OR (exp=%s AND user_id>%s))",
+            (first.exp, guild_id, first.exp, first.exp, first.user_id),
         )
-        await self.cache.execute(
-            "INSERT INTO level_cache VALUES (?, ?, ?)",
-            (guild_id, user_id, int(time.time())),
+        ahead, higher = resp[0]["ahead"], int(resp[0]["higher"])
+        # Same RANK() semantics as request_guild_rank: ties share the rank of the first row.
+        for index, level in enumerate(levels):
+            if level.exp == first.exp:
+                level.rank = higher + 1
+            elif level.exp == levels[index - 1].exp:
+                level.rank = levels[index - 1].rank
+            else:
+                level.rank = ahead + index + 1
+        return levels
+
+    @timed_query
+    async def increment_levels(self, data: List[Tuple[Tuple[int, int], int, int]]):
+        # exp is added on the server side, so concurrent writers never lose each other's exp.
+        await self.execute_many(
+            "INSERT INTO levels (guild_id, user_id, exp, level) VALUES (%s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE exp=exp+VALUES(exp), level=GREATEST(level, VALUES(level))",
+            [
+                (guild_id, user_id, exp, level)
+                for (guild_id, user_id), exp, level in data
+            ],
         )
+
+    @timed_query
+    async def recalculate_levels(
+        self, guild_id: int, calc_level: Callable[[int], int]
+    ) -> int:
+        # Hold the buffer lock so a flush can't write stale levels back in between.
+        async with self.level_buffer.lock:
+            for level in self.level_buffer.guild_levels(guild_id):
+                level.level = calc_level(level.exp)
+            resp = await self.fetch(
+                "SELECT user_id, exp, level FROM levels WHERE guild_id=%s", (guild_id,)
+            )
+            rows = []
+            for x in resp:
+                level = calc_level(x["exp"])
+                if level != x["level"]:
+                    rows.append((level, guild_id, x["user_id"]))
+            if rows:
+                await self.execute_many(
+                    "UPDATE levels SET level=%s WHERE guild_id=%s AND user_id=%s", rows
+                )
+            return len(rows)
+
+    @timed_query
+    async def reset_level(self, guild_id: int, user_id: int = None):
+        param = [guild_id]
+        if user_id:
+            param.append(user_id)
+        # Hold the buffer lock so an in-flight flush can't write the rows back.
+        async with self.level_buffer.lock:
+            self.level_buffer.discard(guild_id, user_id)
+            await self.execute(
+                f"DELETE FROM levels WHERE guild_id=%s{' AND user_id=%s' if user_id else ''}",
+                tuple(param),
+            )
+        index = self.rank_cache.peek(guild_id)
+        if index is not None and user_id:
+            index.remove(user_id)
+        elif index is not None:
+            self.rank_cache.pop(guild_id)
@@ -0,0 +1,102 @@
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from .base import BaseDatabase
+
+
+class SchemaOutdated(Exception):
+    def __init__(self, version: int, missing: List[str]):
+        self.version = version
+        self.missing = missing
+        super().__init__(
+            f"database schema is outdated (version {version}, latest {LATEST_VERSION}"
+            + (f", missing indexes: {', '.join(missing)}" if missing else "")
+            + "), run `python migrate.py` first."
+        )
+
+
+async def has_index(db: BaseDatabase, table: str, name: str) -> bool:
+    resp = await db.fetch(
+        "SELECT 1 FROM information_schema.statistics WHERE table_schema=DATABASE() AND table_name=%s AND index_name=%s LIMIT 1",
+        (table, name),
+    )
+    return bool(resp)
+
+
+async def add_level_keys(db: BaseDatabase):
+    if not await has_index(db, "levels", "PRIMARY"):
+        # Old tables may hold duplicated rows, keep the highest one of each user.
+        await db.execute("DROP TABLE IF EXISTS levels_new")
+        await db.execute("CREATE TABLE levels_new LIKE levels")
+        await db.execute("ALTER TABLE levels_new ADD PRIMARY KEY (guild_id, user_id)")
+        await db.execute(
+            "INSERT INTO levels_new SELECT user_id, guild_id, MAX(exp), MAX(level) FROM levels GROUP BY guild_id, user_id"
+        )
+        await db.execute("RENAME TABLE levels TO levels_old, levels_new TO levels")
+        await db.execute("DROP TABLE levels_old")
+    if not await has_index(db, "levels", "levels_exp"):
+        await db.execute("CREATE INDEX levels_exp ON levels (guild_id, exp, user_id)")
+
+
+async def add_warn_keys(db: BaseDatabase):
+    if not await has_index(db, "warns", "warns_date"):
+        await db.execute("CREATE INDEX warns_date ON warns (guild_id, date)")
+    if not await has_index(db, "warns", "warns_user"):
+        await db.execute("CREATE INDEX warns_user ON warns (guild_id, user_id)")
+
+
+async def has_column(db: BaseDatabase, table: str, name: str) -> bool:
+    resp = await db.fetch(
+        "SELECT 1 FROM information_schema.columns WHERE table_schema=DATABASE() AND table_name=%s AND column_name=%s LIMIT 1",
+        (table, name),
+    )
+    return bool(resp)
+
+
+async def add_settings_version(db: BaseDatabase):
+    if not await has_column(db, "settings", "version"):
+        await db.execute(
+            "ALTER TABLE settings ADD COLUMN version int default 0 not null"
+        )
+
+
+MIGRATIONS: List[Tuple[str, Callable[[BaseDatabase], Awaitable[None]]]] = [
+    ("add primary key and exp index to levels", add_level_keys),
+    ("add guild/date and guild/user indexes to warns", add_warn_keys),
+    ("add optimistic lock version to settings", add_settings_version),
+]
+LATEST_VERSION = len(MIGRATIONS)
+REQUIRED_INDEXES: Dict[str, List[str]] = {
+    "settings": ["PRIMARY"],
+    "levels": ["PRIMARY", "levels_exp"],
+    "warns": ["warns_date", "warns_user"],
+}
+
+
+async def request_schema_version(db: BaseDatabase) -> int:
+    await db.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version (version int not null primary key)"
+    )
+    resp = await db.fetch("SELECT MAX(version) AS version FROM schema_version")
+    return resp[0]["version"] or 0
+
+
+async def migrate(db: BaseDatabase) -> List[str]:
+    version = await request_schema_version(db)
+    applied = []
+    for target, (name, func) in enumerate(MIGRATIONS[version:], start=version + 1):
+        await func(db)
+        await db.execute("INSERT INTO schema_version VALUES (%s)", (target,))
+        applied.append(f"{target}: {name}")
+    return applied
+
+
+async def verify_schema(db: BaseDatabase):
+    version = await request_schema_version(db)
+    missing = [
+        f"{table}.{index}"
+        for table, indexes in REQUIRED_INDEXES.items()
+        for index in indexes
+        if not await has_index(db, table, index)
+    ]
+    if version < LATEST_VERSION or missing:
+        raise SchemaOutdated(version, missing)
@@ -1,21 +1,69 @@
-from typing import Optional
+import bisect
+from typing import List, Optional, Tuple
 
 from .base import BaseFlag, JSONStrInt
 
 
 class LaytheSettingFlags(BaseFlag):
+    __slots__ = ()
     USE_LEVEL = 1 << 0
 
 
 class RewardRoles(JSONStrInt):
-    pass
+    __slots__ = ("__ladder",)
+
+    def __init__(self, data: str):
+        super().__init__(data)
+        self.__ladder: Optional[Tuple[List[int], List[int]]] = None
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.__ladder = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.__ladder = None
+
+    def validate(self):
+        super().validate()
+        for key, value in self.as_dict().items():
+            int(key), int(value)
+
+    @property
+    def ladder(self) -> Tuple[List[int], List[int]]:
+        if self.__ladder is None:
+            rewards = sorted((int(k), v) for k, v in self.as_dict().items())
+            self.__ladder = [x[0] for x in rewards], [x[1] for x in rewards]
+        return self.__ladder
+
+    def roles_for(self, level: int) -> List[int]:
+        levels, roles = self.ladder
+        return roles[: bisect.bisect_right(levels, level)]
 
 
 class WarnActions(JSONStrInt):
-    pass
+    __slots__ = ()
 
 
 class Setting:
+    __slots__ = (
+        "guild_id",
+        "accepted",
+        "custom_prefix",
+        "flags",
+        "mute_role",
+        "log_channel",
+        "welcome_channel",
+        "starboard_channel",
+        "greet",
+        "greet_dm",
+        "bye",
+        "reward_roles",
+        "warn_actions",
+        "version",
+        "__original",
+    )
+
     def __init__(self, data: dict):
         self.guild_id: int = int(data["guild_id"])
         self.accepted: bool = bool(data["accepted"])
@@ -36,6 +84,8 @@ class Setting:
         self.bye: Optional[str] = data["bye"]
         self.reward_roles: RewardRoles = RewardRoles(data["reward_roles"] or "{}")
         self.warn_actions: WarnActions = WarnActions(data["warn_actions"] or "{}")
+        self.version: int = int(data.get("version") or 0)
+        self.__original = self.to_dict()
 
     def to_dict(self) -> dict:
         return {
@@ -54,8 +104,42 @@ class Setting:
             "warn_actions": self.warn_actions.to_str(),
         }
 
+    def changes(self) -> dict:
+        return {k: v for k, v in self.to_dict().items() if self.__original[k] != v}
+
+    def merge(self, data: dict):
+        # Applies (part of) a settings payload, changes() still compares with the loaded state.
+        merged = Setting({**self.to_dict(), "version": self.version, **data})
+        merged.reward_roles.validate()
+        merged.warn_actions.validate()
+        for key in self.__slots__[:-1]:
+            setattr(self, key, getattr(merged, key))
+
+    @classmethod
+    def create(cls, guild_id: int):
+        # Same defaults as the settings table, used until the guild saves anything.
+        return cls(
+            {
+                "guild_id": guild_id,
+                "accepted": False,
+                "custom_prefix": None,
+                "flags": 0,
+                "mute_role": None,
+                "log_channel": None,
+                "welcome_channel": None,
+                "starboard_channel": None,
+                "greet": None,
+                "greet_dm": None,
+                "bye": None,
+                "reward_roles": None,
+                "warn_actions": None,
+            }
+        )
+
 
 class Warn:
+    __slots__ = ("guild_id", "date", "user_id", "mod_id", "reason")
+
     def __init__(self, data: dict):
         self.guild_id: int = data["guild_id"]
         self.date: int = data["date"]
@@ -86,6 +170,8 @@ class Warn:
 
 
 class Level:
+    __slots__ = ("user_id", "guild_id", "exp", "level", "rank")
+
     def __init__(self, data: dict):
         self.user_id: int = data["user_id"]
         self.guild_id: int = data["guild_id"]
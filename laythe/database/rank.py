@@ -0,0 +1,35 @@
+import bisect
+from typing import Dict, Iterable, List, Tuple
+
+
+class RankIndex:
+    def __init__(self, levels: Iterable[Tuple[int, int]]):
+        self.exps: Dict[int, int] = dict(levels)
+        # Sorted by exp descending, then user_id, so bisect gives how many members are ahead.
+        self.keys: List[Tuple[int, int]] = sorted(
+            (-exp, user_id) for user_id, exp in self.exps.items()
+        )
+
+    def __len__(self):
+        return len(self.keys)
+
+    def update(self, user_id: int, exp: int):
+        old = self.exps.get(user_id)
+        if old == exp:
+            return
+        if old is not None:
+            index = bisect.bisect_left(self.keys, (-old, user_id))
+            del self.keys[index]
+        self.exps[user_id] = exp
+        bisect.insort(self.keys, (-exp, user_id))
+
+    def remove(self, user_id: int):
+        exp = self.exps.pop(user_id, None)
+        if exp is not None:
+            del self.keys[bisect.bisect_left(self.keys, (-exp, user_id))]
+
+    def rank(self, exp: int) -> int:
+        return bisect.bisect_left(self.keys, (-exp,)) + 1
+
+    def top(self, count: int) -> List[Tuple[int, int]]:
+        return [(user_id, -exp) for exp, user_id in self.keys[:count]]
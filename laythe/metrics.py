@@ -0,0 +1,188 @@
+import bisect
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Metric:
+    type: str
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if labels.keys() != set(self.labels):
+            raise ValueError(f"`{self.name}` requires labels {self.labels}")
+        return tuple(str(labels[x]) for x in self.labels)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join(
+            [
+                f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.type}",
+                *self.samples(),
+            ]
+        )
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.label_values(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, key)} {value}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self.values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self.label_values(labels)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterable[str]:
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{format_labels(self.labels, key, le=bound)} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, key)} {total[0]}"
+            yield f"{self.name}_count{format_labels(self.labels, key)} {cumulative}"
+
+
+class CallbackMetric(Metric):
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        labels: Sequence[str],
+        func: Callable[[], Iterable[Tuple[LabelValues, float]]],
+    ):
+        super().__init__(name, documentation, labels)
+        self.type = metric_type
+        self.func = func
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.func():
+            yield f"{self.name}{format_labels(self.labels, key)} {value}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        return self.register(Histogram(name, documentation, labels))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        labels: Sequence[str],
+        func: Callable[[], Iterable[Tuple[LabelValues, float]]],
+    ):
+        return self.register(
+            CallbackMetric(name, documentation, metric_type, labels, func)
+        )
+
+    def render(self) -> str:
+        return "\n".join(x.render() for x in self.metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+GATEWAY_EVENTS: Counter = REGISTRY.counter(
+    "laythe_gateway_events_total", "Dispatched gateway events.", ("event",)
+)
+HANDLER_SECONDS: Histogram = REGISTRY.histogram(
+    "laythe_handler_seconds", "Addon event handler duration.", ("addon", "handler")
+)
+HANDLER_BUSY_SECONDS: Histogram = REGISTRY.histogram(
+    "laythe_handler_busy_seconds",
+    "Addon event handler time spent running, excluding awaited IO.",
+    ("addon", "handler"),
+)
+DB_QUERY_SECONDS: Histogram = REGISTRY.histogram(
+    "laythe_db_query_seconds", "LaytheDB query latency.", ("method",)
+)
+REST_SECONDS: Histogram = REGISTRY.histogram(
+    "laythe_rest_seconds", "Outbound REST call latency.", ("priority",)
+)
+REST_WAIT_SECONDS: Histogram = REGISTRY.histogram(
+    "laythe_rest_wait_seconds", "Time outbound REST calls spent queued.", ("priority",)
+)
+REST_RATE_LIMIT_FAILURES: Counter = REGISTRY.counter(
+    "laythe_rest_rate_limit_failures_total",
+    "Outbound REST calls that failed with 429 after dico's own retries ran out.",
+    ("priority",),
+)
+
+
+def timed_query(func):
+    @functools.wraps(func)
+    async def wrap(*args, **kwargs):
+        with DB_QUERY_SECONDS.time(method=func.__name__):
+            return await func(*args, **kwargs)
+
+    return wrap
@@ -0,0 +1,119 @@
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from dico.exception import RateLimited
+
+from .metrics import REST_RATE_LIMIT_FAILURES, REST_SECONDS, REST_WAIT_SECONDS
+
+
+class Priority(IntEnum):
+    MODERATION = 0
+    REPLY = 1
+    LOGGING = 2
+    PRESENCE = 3
+
+
+class PriorityStats:
+    def __init__(self):
+        self.queued = 0
+        self.requests = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.latency = 0.0
+        # Only calls dico gave up on, it retries 429s internally first.
+        self.rate_limit_failures = 0
+
+
+class RESTScheduler:
+    RATE_LIMIT_BACKOFF = 1.0
+
+    def __init__(self, concurrency: int, reserved: int):
+        self.concurrency = concurrency
+        # Slots only moderation actions and replies may use, so they never queue behind bulk logging.
+        self.reserved = reserved
+        self.running = 0
+        self.stats: Dict[Priority, PriorityStats] = {
+            x: PriorityStats() for x in Priority
+        }
+        self.blocked_routes: Dict[str, float] = {}
+        self.__waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.__counter = itertools.count()
+
+    def __limit(self, priority: Priority) -> int:
+        if priority <= Priority.REPLY:
+            return self.concurrency
+        return self.concurrency - self.reserved
+
+    def __wake(self):
+        while self.__waiters:
+            priority, _, future = self.__waiters[0]
+            if future.cancelled():
+                heapq.heappop(self.__waiters)
+                continue
+            if self.running >= self.__limit(priority):
+                break
+            heapq.heappop(self.__waiters)
+            self.running += 1
+            future.set_result(None)
+
+    async def __acquire(self, priority: Priority):
+        if self.running < self.__limit(priority) and (
+            not self.__waiters or self.__waiters[0][0] > priority
+        ):
+            self.running += 1
+            return
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self.__waiters, (priority, next(self.__counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.__release()
+            raise
+
+    def __release(self):
+        self.running -= 1
+        self.__wake()
+
+    async def run(
+        self,
+        priority: Priority,
+        route: str,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs,
+    ) -> Any:
+        stats = self.stats[priority]
+        queued_at = time.monotonic()
+        stats.queued += 1
+        try:
+            blocked_until = self.blocked_routes.get(route)
+            if blocked_until and blocked_until > queued_at:
+                await asyncio.sleep(blocked_until - queued_at)
+            elif blocked_until:
+                del self.blocked_routes[route]
+            await self.__acquire(priority)
+        finally:
+            stats.queued -= 1
+        started_at = time.monotonic()
+        wait_time = started_at - queued_at
+        stats.requests += 1
+        stats.wait_time += wait_time
+        stats.max_wait_time = max(stats.max_wait_time, wait_time)
+        REST_WAIT_SECONDS.observe(wait_time, priority=priority.name.lower())
+        try:
+            return await func(*args, **kwargs)
+        except RateLimited:
+            stats.rate_limit_failures += 1
+            REST_RATE_LIMIT_FAILURES.inc(priority=priority.name.lower())
+            self.blocked_routes[route] = time.monotonic() + self.RATE_LIMIT_BACKOFF
+            raise
+        finally:
+            latency = time.monotonic() - started_at
+            stats.latency += latency
+            REST_SECONDS.observe(latency, priority=priority.name.lower())
+            self.__release()
@@ -0,0 +1,127 @@
+import time
+from logging import Logger
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from dico_command import Addon
+from dico_command.addon import Listener
+
+from .metrics import HANDLER_BUSY_SECONDS, HANDLER_SECONDS
+
+
+class TracedCoroutine:
+    # Drives the wrapped coroutine step by step, so time spent running it (busy) can be
+    # told apart from time spent suspended on IO.
+    def __init__(self, coro):
+        self.coro = coro
+        self.busy = 0.0
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is None:
+                    future = self.coro.send(value)
+                else:
+                    future = self.coro.throw(error)
+            except StopIteration as ex:
+                return ex.value
+            finally:
+                self.busy += time.perf_counter() - start
+            try:
+                value, error = (yield future), None
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as ex:
+                value, error = None, ex
+
+
+class HandlerStats:
+    def __init__(self, event: str):
+        self.event = event
+        self.calls = 0
+        self.errors = 0
+        self.slow = 0
+        self.wall_time = 0.0
+        self.io_time = 0.0
+        self.max_wall_time = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "event": self.event,
+            "calls": self.calls,
+            "errors": self.errors,
+            "slow": self.slow,
+            "wall_time": self.wall_time,
+            "io_time": self.io_time,
+            "max_wall_time": self.max_wall_time,
+            "avg_wall_time": self.wall_time / self.calls if self.calls else 0.0,
+        }
+
+
+def find_guild_id(args: Tuple[Any, ...]) -> Optional[int]:
+    for x in args:
+        guild_id = getattr(x, "guild_id", None)
+        if guild_id:
+            return int(guild_id)
+    return None
+
+
+def handler_name(addon: Addon, listener: Listener) -> str:
+    # `@on` leaves the Listener on the addon class under the handler's name.
+    for cls in type(addon).__mro__:
+        for name, value in vars(cls).items():
+            if value is listener:
+                return name
+    return listener.event
+
+
+class HandlerTracer:
+    def __init__(self, logger: Logger, threshold: float):
+        self.logger = logger
+        self.threshold = threshold
+        self.stats: Dict[Tuple[str, str], HandlerStats] = {}
+
+    def wrap(self, addon: Addon, listener: Listener) -> Callable[..., Awaitable[Any]]:
+        func = listener.func
+        event = listener.event
+        labels = {
+            "addon": addon.name,
+            "handler": handler_name(addon, listener),
+        }
+        stats = self.stats[(labels["addon"], labels["handler"])] = HandlerStats(event)
+
+        async def wrap(*args, **kwargs):
+            traced = TracedCoroutine(func(*args, **kwargs))
+            start = time.perf_counter()
+            try:
+                return await traced
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                wall_time = time.perf_counter() - start
+                io_time = max(wall_time - traced.busy, 0.0)
+                stats.calls += 1
+                stats.wall_time += wall_time
+                stats.io_time += io_time
+                stats.max_wall_time = max(stats.max_wall_time, wall_time)
+                HANDLER_SECONDS.observe(wall_time, **labels)
+                HANDLER_BUSY_SECONDS.observe(traced.busy, **labels)
+                if wall_time >= self.threshold:
+                    stats.slow += 1
+                    self.logger.warning(
+                        f"Slow handler {labels['addon']}.{labels['handler']} for `{event}` "
+                        f"(guild {find_guild_id(args)}): {wall_time:.3f}s total, {io_time:.3f}s awaiting IO"
+                    )
+
+        return wrap
+
+    def to_dict(self) -> dict:
+        return {
+            f"{addon}.{handler}": stats.to_dict()
+            for (addon, handler), stats in sorted(
+                self.stats.items(), key=lambda x: x[1].wall_time, reverse=True
+            )
+        }
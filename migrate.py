@@ -0,0 +1,41 @@
+"""
+    laythe-v2
+    Copyright (C) 2022 CodeNU
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+
+from config import Config
+
+from laythe.database import LaytheDB, migrate
+
+
+async def main():
+    database = await LaytheDB.login(
+        host=Config.DB_HOST,
+        port=Config.DB_PORT,
+        login_id=Config.DB_ID,
+        login_pw=Config.DB_PW,
+        db_name=Config.DB_NAME,
+    )
+    try:
+        applied = await migrate(database)
+    finally:
+        await database.close()
+    if applied:
+        print("Applied migrations:\n" + "\n".join(applied))
+    else:
+        print("Database schema is already up to date.")
+
+
+asyncio.run(main())